@@ -2,40 +2,92 @@
 import socket
 import sys
 import os
+import collections
 import threading
 import queue
 import select
+import errno
 import time
 import re
+import itertools
 import argparse
-from prompt_toolkit import PromptSession
-from prompt_toolkit.history import FileHistory
-from prompt_toolkit.shortcuts import CompleteStyle
-from prompt_toolkit.key_binding import KeyBindings
-from prompt_toolkit.completion import Completer, Completion, WordCompleter, ThreadedCompleter
-from prompt_toolkit.styles import Style
-from prompt_toolkit.formatted_text import HTML
+from concurrent.futures import ThreadPoolExecutor
+
+# prompt_toolkit is imported lazily inside the interactive code paths so that
+# one-shot --eval/--script invocations skip its import cost entirely
+
+# Matches find_ent output lines of the form: 'classname' : 'entityname'
+# [^']* avoids the backtracking the lazy .*? form incurs
+_ENT_RE = re.compile(r"\s*'(?P<class>[^']*)'\s*:\s*'(?P<entity>[^']*)'")
+
+# Matches the cvar name at the start of each cvarlist output line
+_CVAR_NAME_RE = re.compile(r'^\s*([^\s:]+)\s*:', re.M)
+class PrefixTrie:
+    """Prefix tree keyed on lowercased strings for O(L) prefix lookup."""
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, key, value):
+        node = self.root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node.setdefault(None, []).append(value)
+
+    def iter_prefix(self, prefix):
+        """Yield all values whose key starts with the given prefix."""
+        node = self.root
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return
+        yield from self._iter_values(node)
+
+    def _iter_values(self, node):
+        for ch, child in node.items():
+            if ch is None:
+                yield from child
+            else:
+                yield from self._iter_values(child)
 
 class SourceConsoleHistory:
     def __init__(self, histfile=None):
+        from prompt_toolkit.history import FileHistory
         self.histfile = histfile or os.path.join(os.path.expanduser("~"), ".sourceconsole_history")
         self.file_history = FileHistory(self.histfile)
 
 class SourceConsole:
+    # Autocomplete only shows a handful of suggestions; stop parsing
+    # find_ent output once this many pairs have been collected
+    _MAX_COMPLETIONS = 50
+
     def __init__(self, port=8020, continuous_output=True, verbose=True, interactive=True):
         self.port = port
         self.sock = None
         self.running = False
+        # Holds bytes of a line split across recv() boundaries
+        self._recv_buf = bytearray()
         self.output_queue = queue.Queue()
-        self.lock = threading.Lock()
+        # Commands to send; the send thread owns the socket write side
+        self._send_queue = queue.SimpleQueue()
+        # Set by read_output whenever new output arrives; lets send_command
+        # wait for the first response without polling
+        self.response_event = threading.Event()
         self.last_command = None
         self.is_autocomplete_query = False
-        self.autocomplete_results = {}
+        # LRU cache of prefix -> raw (class, entity) pairs from find_ent.
+        # Storing unfiltered pairs lets one round-trip serve both completion
+        # modes and every extension of the prefix.
+        self.autocomplete_results = collections.OrderedDict()
+        self.autocomplete_cache_size = 32
         self.autocomplete_lock = threading.Lock()
+        # prefix -> Event set once the query for that prefix has finished
         self.query_in_progress = {}
+        # Single worker so engine queries serialize instead of interleaving responses
+        self._query_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="entq")
         self.cvar_list = []
-        self.suppress_output = False
-        self.suppress_lock = threading.Lock()
+        self.cvar_trie = PrefixTrie()
+        # Set while an internal query (cvarlist/find_ent) owns the console output
+        self.suppress_event = threading.Event()
         self.continuous_output = continuous_output
         self.verbose = verbose
         self.interactive = interactive
@@ -43,18 +95,33 @@ class SourceConsole:
     def connect(self):
         try:
             self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.sock.settimeout(3)
-            self.sock.connect(('localhost', self.port))
+            # Non-blocking connect with a select deadline keeps the main thread
+            # interruptible (Ctrl+C) instead of parking in connect() for 3s
             self.sock.setblocking(False)
+            try:
+                self.sock.connect(('localhost', self.port))
+            except BlockingIOError:
+                pass
+            _, writable, _ = select.select([], [self.sock], [], 3.0)
+            if not writable:
+                raise ConnectionRefusedError(f"timed out connecting to port {self.port}")
+            err = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if err:
+                if err == errno.ECONNREFUSED:
+                    raise ConnectionRefusedError(os.strerror(err))
+                raise OSError(err, os.strerror(err))
+            # Commands are tiny and each waits on a response, so disable
+            # Nagle to avoid stacking send delay on top of delayed ACKs
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # Short timeout so the read thread can periodically re-check self.running
+            self.sock.settimeout(0.5)
             if self.verbose:
                 print(f"Connected to Source Engine console on port {self.port}.")
             self.running = True
             self.read_thread = threading.Thread(target=self.read_output, daemon=True)
             self.read_thread.start()
-            # Start continuous output thread if enabled
-            if self.continuous_output:
-                self.output_display_thread = threading.Thread(target=self.display_continuous_output, daemon=True)
-                self.output_display_thread.start()
+            self.send_thread = threading.Thread(target=self._send_loop, daemon=True)
+            self.send_thread.start()
             if self.interactive:
                 # Load CVAR list on startup
                 self.load_cvar_list()
@@ -69,18 +136,57 @@ class SourceConsole:
     def read_output(self):
         while self.running:
             try:
-                readable, _, _ = select.select([self.sock], [], [], 0.1)
-                if self.sock in readable:
-                    data = self.sock.recv(4096)
-                    if not data:
-                        self.running = False
-                        self.output_queue.put(("Connection closed by server.", False))
+                # Wake quickly while a partial line is pending so it can be
+                # flushed if the stream goes quiet, but keep the long timeout
+                # on an empty buffer to avoid spinning
+                self.sock.settimeout(0.05 if self._recv_buf else 0.5)
+                # 64 KiB amortises syscall cost on bursts like cvarlist output
+                data = self.sock.recv(65536)
+                if not data:
+                    if not self.running:
+                        # close() already shut the socket down to unblock us;
+                        # don't report a local exit as a remote close
+                        break
+                    self.running = False
+                    if self._recv_buf:
+                        # Flush a trailing partial line before reporting the close
+                        line = self._recv_buf.decode('utf-8', errors='ignore')
+                        self._recv_buf.clear()
+                        self._emit_line(line, self.is_autocomplete_query)
+                    self._emit_line("Connection closed by server.", False)
+                    break
+                # Delete every \r in one C-level pass so \r\n endings
+                # normalize before decode
+                self._recv_buf.extend(data.translate(None, b'\r'))
+                display_batch = []
+                got_line = False
+                while True:
+                    newline = self._recv_buf.find(b'\n')
+                    if newline < 0:
                         break
-                    output = data.decode('utf-8', errors='ignore')
-                    if output:
-                        # replace \r\n with \n for consistent line endings
-                        output = output.replace('\r\n', '\n')
-                        self.output_queue.put((output, self.is_autocomplete_query))
+                    line = self._recv_buf[:newline].decode('utf-8', errors='ignore')
+                    del self._recv_buf[:newline + 1]
+                    if self.continuous_output and not self.suppress_event.is_set():
+                        display_batch.append(line)
+                    else:
+                        self.output_queue.put((line, self.is_autocomplete_query))
+                    got_line = True
+                if display_batch:
+                    # One write+flush per recv burst instead of one per line
+                    sys.stdout.write('\n'.join(display_batch) + '\n')
+                    sys.stdout.flush()
+                if got_line:
+                    self.response_event.set()
+            except socket.timeout:
+                if self._recv_buf:
+                    # The stream went quiet mid-line: a response whose final
+                    # line has no trailing newline would otherwise sit in the
+                    # buffer forever while the connection stays open
+                    line = self._recv_buf.decode('utf-8', errors='ignore')
+                    self._recv_buf.clear()
+                    self._emit_line(line, self.is_autocomplete_query)
+                    self.response_event.set()
+                continue
             except socket.error:
                 continue
             except Exception as e:
@@ -88,248 +194,322 @@ class SourceConsole:
                 print(f"Read error: {e}", file=sys.stderr)
                 break
 
+    def _send_loop(self):
+        """Consume queued commands and write them to the socket.
+
+        Only this thread touches the write side, so last_command and
+        is_autocomplete_query need no lock.
+        """
+        while self.running:
+            try:
+                item = self._send_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            cmd, is_autocomplete = item
+            try:
+                self.last_command = cmd
+                self.is_autocomplete_query = is_autocomplete
+                # sendall guarantees the whole command goes out even on a
+                # short write; commands are single small packets
+                self.sock.sendall((cmd + '\n').encode())
+            except Exception as e:
+                if self.verbose:
+                    print(f"Error sending command: {e}", file=sys.stderr)
+                self.running = False
+                break
+
     def send_command(self, cmd, is_autocomplete=False, wait_for_output=True):
         if not self.running:
             print("Error: Not connected to Source Engine console.", file=sys.stderr)
             return False
-        try:
-            with self.lock:
-                self.last_command = cmd
-                self.is_autocomplete_query = is_autocomplete
-                self.sock.send((cmd + '\n').encode())
-            if wait_for_output:
-                deadline = time.time() + 0.5
-                while time.time() < deadline:
-                    if not self.output_queue.empty():
-                        break
-                    time.sleep(0.01)
-            return True
-        except Exception as e:
-            if self.verbose:
-                print(f"Error sending command: {e}", file=sys.stderr)
-            self.running = False
-            return False
+        self.response_event.clear()
+        self._send_queue.put((cmd, is_autocomplete))
+        if wait_for_output:
+            self.response_event.wait(0.5)
+        return True
 
     def get_output(self, timeout=0.5, filter_autocomplete=True):
-        result = ''
-        stop_time = time.time() + timeout
-        while time.time() < stop_time:
-            try:
-                output, is_autocomplete = self.output_queue.get_nowait()
-                if filter_autocomplete or not is_autocomplete:
-                    result += output
-                stop_time = time.time() + timeout  # Reset timeout on new output
-            except queue.Empty:
-                time.sleep(0.01)
-                continue
-        return result
-    
-    def get_output_lines(self, timeout=0.5, filter_autocomplete=True):
-        return self.get_output(timeout, filter_autocomplete).splitlines()
+        lines = self.get_output_lines(timeout, filter_autocomplete)
+        if not lines:
+            return ''
+        return '\n'.join(lines) + '\n'
 
-    def display_continuous_output(self):
-        """Continuously fetch and display console output in a separate thread."""
-        while self.running:
+    def get_output_lines(self, timeout=0.5, filter_autocomplete=True):
+        lines = []
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
             try:
-                with self.suppress_lock:
-                    if self.suppress_output:
-                        time.sleep(0.01)
-                        continue
-                    output, _ = self.output_queue.get(timeout=0.05)
-                    print(output, end='', flush=True)
+                line, is_autocomplete = self.output_queue.get(timeout=remaining)
             except queue.Empty:
-                time.sleep(0.01)
-                continue
-            except Exception as e:
-                print(f"Error in continuous output: {e}", file=sys.stderr)
+                break
+            if filter_autocomplete or not is_autocomplete:
+                lines.append(line)
+            deadline = time.monotonic() + timeout  # Reset timeout on new output
+        return lines
+
+    def _drain_queue(self):
+        """Discard stale queued output in a single critical section.
+
+        Clearing the deque under the queue's own mutex takes one lock
+        acquisition instead of one per item and cannot race the producer
+        the way the empty()/get_nowait() loop could.
+        """
+        q = self.output_queue
+        with q.mutex:
+            q.queue.clear()
+            q.unfinished_tasks = 0
+            q.all_tasks_done.notify_all()
+
+    def _emit_line(self, line, is_autocomplete):
+        """Print a line directly in continuous mode, otherwise queue it for a consumer."""
+        if self.continuous_output and not self.suppress_event.is_set():
+            print(line, flush=True)
+        else:
+            self.output_queue.put((line, is_autocomplete))
 
     def load_cvar_list(self):
         """Load CVAR list by running the 'cvarlist' command."""
         try:
-            with self.suppress_lock:
-                self.suppress_output = True  # Suppress output during cvarlist
+            self.suppress_event.set()  # Suppress output during cvarlist
 
-            while not self.output_queue.empty():
-                self.output_queue.get_nowait()
+            self._drain_queue()
 
             self.send_command("cvarlist", is_autocomplete=True, wait_for_output=False)
 
-            output_lines = self.get_output_lines(filter_autocomplete=True)
-
-            cvar_list = []
-            for line in output_lines:
-                parts = line.split(":")
-                if parts and parts[0].strip():
-                    cvar_list.append(parts[0].strip())
-
-            self.cvar_list = sorted(cvar_list)
+            raw = self.get_output(filter_autocomplete=True)
+
+            # One compiled-regex pass over the whole dump instead of
+            # per-line partition/strip allocations
+            self.cvar_list = sorted(set(_CVAR_NAME_RE.findall(raw)))
+            trie = PrefixTrie()
+            for cvar in self.cvar_list:
+                trie.insert(cvar.casefold(), cvar)
+            # Publish the fully-built trie with one atomic assignment; readers
+            # snapshot the reference and iterate lock-free since a published
+            # trie is never mutated again
+            self.cvar_trie = trie
             if self.verbose:
                 print(f"Loaded {len(self.cvar_list)} CVARs for autocompletion.")
         except Exception as e:
             print(f"Error loading CVAR list: {e}", file=sys.stderr)
             self.cvar_list = []
+            self.cvar_trie = PrefixTrie()
         finally:
-            with self.suppress_lock:
-                self.suppress_output = False
+            self.suppress_event.clear()
 
-    def query_entities(self, prefix, find_class_names=False, find_entity_names=True):
-        """Query class names and/or entity names and store results in autocomplete_results."""
+    def query_entities(self, prefix):
+        """Run find_ent for prefix and cache the raw (class, entity) pairs."""
         try:
-            with self.suppress_lock:
-                self.suppress_output = True  # Suppress output during query_entities
+            self.suppress_event.set()  # Suppress output during query_entities
 
-            while not self.output_queue.empty():
-                self.output_queue.get_nowait()
+            self._drain_queue()
 
             self.send_command(f"find_ent {prefix}", is_autocomplete=True, wait_for_output=False)
 
             output_lines = self.get_output_lines(timeout=0.1, filter_autocomplete=True)
 
-            class_names = []
-            entity_names = []
+            pairs = []
             for line in output_lines:
-                match = re.match(r"\s*'(?P<class>.*?)'\s*:\s*'(?P<entity>.*?)'", line)
+                match = _ENT_RE.match(line)
                 if match:
-                    class_name = match.group('class')
-                    entity_name = match.group('entity')
-                    if find_class_names and class_name.lower().startswith(prefix.lower()):
-                        class_names.append(class_name)
-                    if find_entity_names and entity_name.lower().startswith(prefix.lower()):
-                        entity_names.append(entity_name)
-
-            # Combine and deduplicate results
-            combined_results = sorted(set(class_names + entity_names))
+                    pairs.append((match.group('class'), match.group('entity')))
+                    if len(pairs) >= self._MAX_COMPLETIONS:
+                        break
 
             with self.autocomplete_lock:
-                self.autocomplete_results[prefix] = combined_results
-                self.query_in_progress[prefix] = False
+                self._cache_results(prefix, pairs)
         except Exception as e:
             if self.verbose:
                 print(f"Error querying entities: {e}", file=sys.stderr)
             with self.autocomplete_lock:
-                self.autocomplete_results[prefix] = []
-                self.query_in_progress[prefix] = False
+                self._cache_results(prefix, [])
         finally:
-            with self.suppress_lock:
-                self.suppress_output = False
+            self.suppress_event.clear()
+            with self.autocomplete_lock:
+                event = self.query_in_progress.get(prefix)
+            if event is not None:
+                event.set()
+            if self.interactive:
+                # Redraw so the completer re-runs and serves the fresh cache
+                try:
+                    from prompt_toolkit.application.current import get_app
+                    get_app().invalidate()
+                except Exception:
+                    pass
+
+    def _cache_results(self, key, results):
+        """Store results in the LRU cache; caller must hold autocomplete_lock."""
+        self.autocomplete_results[key] = results
+        self.autocomplete_results.move_to_end(key)
+        while len(self.autocomplete_results) > self.autocomplete_cache_size:
+            self.autocomplete_results.popitem(last=False)
 
     def close(self):
         self.running = False
+        self._send_queue.put(None)  # Unblock the send thread
+        self._query_executor.shutdown(wait=False)
         if self.sock:
+            try:
+                # Unblock the reader parked in recv()
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             self.sock.close()
         self.sock = None
 
-# Custom completer that handles CVARs and entity/class names
-class SourceConsoleCompleter(Completer):
-    def __init__(self, console):
-        self.console = console
-        self.cvar_completer = WordCompleter(self.console.cvar_list, ignore_case=True)
-        # Commands that take entity names as their first argument
-        self.entity_commands = {"ent_fire", "ent_dump", "ent_keyvalue"}
-        # Commands that take either class names or entity names as their first argument
-        self.class_entity_commands = {"ent_text", "ent_messages"}
-        self.last_prefix = None
-
-    def get_completions(self, document, complete_event):
-        text = document.text_before_cursor
-        words = text.split()
-
-        # Handle commands that take either class names or entity names
-        if len(words) >= 1 and words[0].lower() in self.class_entity_commands:
-            if len(words) == 1:
-                for cmd in self.class_entity_commands:
-                    if cmd.startswith(text.lower()):
-                        yield Completion(cmd, start_position=-len(text), display=cmd)
-            else:
-                arg = words[-1]
-                with self.console.autocomplete_lock:
-                    if arg != self.last_prefix or arg not in self.console.autocomplete_results:
-                        self.last_prefix = arg
-                        self.console.query_in_progress[arg] = True
-                        threading.Thread(
-                            target=self.console.query_entities,
-                            args=(arg, True, True),  # Find both class names and entity names
-                            daemon=True
-                        ).start()
-                    else:
-                        results = self.console.autocomplete_results.get(arg, [])
-                        for result in results:
-                            yield Completion(
-                                result,
-                                start_position=-len(words[-1]),
-                                display=result
-                            )
-                        return
-
-                start_time = time.time()
-                while time.time() - start_time < 1.0:
-                    with self.console.autocomplete_lock:
-                        if not self.console.query_in_progress.get(arg, False):
-                            results = self.console.autocomplete_results.get(arg, [])
-                            for result in results:
-                                yield Completion(
-                                    result,
-                                    start_position=-len(words[-1]),
-                                    display=result
-                                )
+_completer_cls = None
+
+def _get_completer_cls():
+    """Define the completer on first use so --eval runs never import prompt_toolkit."""
+    global _completer_cls
+    if _completer_cls is not None:
+        return _completer_cls
+    from prompt_toolkit.completion import Completer, Completion
+
+    # Custom completer that handles CVARs and entity/class names
+    class SourceConsoleCompleter(Completer):
+        # Cap suggestions per keystroke; more than this is noise and costs latency
+        _MAX_COMPLETIONS = 50
+
+        def __init__(self, console):
+            self.console = console
+            # Commands that take entity names as their first argument
+            self.entity_commands = frozenset({"ent_fire", "ent_dump", "ent_keyvalue"})
+            self._entity_cmds_sorted = tuple(sorted(self.entity_commands))
+            # Commands that take either class names or entity names as their first argument
+            self.class_entity_commands = frozenset({"ent_text", "ent_messages"})
+            self._class_entity_cmds_sorted = tuple(sorted(self.class_entity_commands))
+            # Debounce timer so rapid keystrokes only dispatch the latest prefix
+            self._debounce_timer = None
+            self._debounce_delay = 0.15
+            self._pending_arg = None
+
+        def _schedule_query(self, arg):
+            """Schedule a debounced entity query; caller must hold autocomplete_lock."""
+            if self._debounce_timer is not None:
+                self._debounce_timer.cancel()
+                # Unblock the superseded prefix so it can be re-queried later
+                if self._pending_arg is not None and self._pending_arg != arg:
+                    self.console.query_in_progress.pop(self._pending_arg, None)
+            self._pending_arg = arg
+            timer = threading.Timer(
+                self._debounce_delay,
+                self.console._query_executor.submit,
+                args=(self.console.query_entities, arg),
+            )
+            timer.daemon = True
+            self._debounce_timer = timer
+            timer.start()
+
+        def _cached_results(self, arg, find_class_names, find_entity_names):
+            """Return names matching arg for the given mode from cached find_ent pairs.
+
+            The cache holds raw (class, entity) pairs, so results fetched for a
+            shorter prefix subsume ours regardless of mode; filter them in memory
+            instead of round-tripping to the engine.
+            """
+            with self.console.autocomplete_lock:
+                pairs = None
+                if arg in self.console.autocomplete_results:
+                    self.console.autocomplete_results.move_to_end(arg)
+                    pairs = self.console.autocomplete_results[arg]
+                else:
+                    for end in range(len(arg) - 1, 0, -1):
+                        shorter = arg[:end]
+                        if shorter in self.console.autocomplete_results:
+                            candidate = self.console.autocomplete_results[shorter]
+                            # A result truncated at the parse cap is not a
+                            # superset of longer prefixes; treat it as a miss
+                            # so the engine is queried for the exact prefix
+                            if len(candidate) >= SourceConsole._MAX_COMPLETIONS:
+                                continue
+                            pairs = candidate
                             break
-                    time.sleep(0.05)
-
-        # Handle commands that take only entity names
-        elif len(words) >= 1 and words[0].lower() in self.entity_commands:
-            if len(words) == 1:
-                for cmd in self.entity_commands:
-                    if cmd.startswith(text.lower()):
-                        yield Completion(cmd, start_position=-len(text), display=cmd)
+                if pairs is None:
+                    return None
+            arg_cf = arg.casefold()
+            names = set()
+            for class_name, entity_name in pairs:
+                if find_class_names and class_name.casefold().startswith(arg_cf):
+                    names.add(class_name)
+                if find_entity_names and entity_name.casefold().startswith(arg_cf):
+                    names.add(entity_name)
+            return sorted(names)
+
+        def _complete_command_names(self, text_cf, commands):
+            """Complete a partially-typed command name from the given sorted tuple."""
+            for cmd in commands:
+                if cmd.startswith(text_cf):
+                    yield Completion(cmd, start_position=-len(text_cf), display=cmd)
+
+        def _complete_entity_arg(self, words, find_class_names, find_entity_names):
+            """Complete an entity/class argument, querying the engine on cache miss."""
+            arg = words[-1]
+            neg_len = -len(arg)
+            results = self._cached_results(arg, find_class_names, find_entity_names)
+            if results is not None:
+                for result in results:
+                    yield Completion(result, start_position=neg_len, display=result)
+                return
+            # Cache miss: dispatch the query and yield nothing now. query_entities
+            # invalidates the app when results land, so the completer re-runs and
+            # serves them from the cache instead of blocking this keystroke.
+            with self.console.autocomplete_lock:
+                event = self.console.query_in_progress.get(arg)
+                if event is None or event.is_set():
+                    self.console.query_in_progress[arg] = threading.Event()
+                    self._schedule_query(arg)
+
+        def get_completions(self, document, complete_event):
+            text = document.text_before_cursor
+            text_cf = text.casefold()
+            words = text.split()
+            first_word_cf = words[0].casefold() if words else ''
+
+            # Handle commands that take either class names or entity names
+            if first_word_cf in self.class_entity_commands:
+                if len(words) == 1:
+                    yield from self._complete_command_names(text_cf, self._class_entity_cmds_sorted)
+                else:
+                    # Find both class names and entity names
+                    yield from self._complete_entity_arg(words, True, True)
+
+            # Handle commands that take only entity names
+            elif first_word_cf in self.entity_commands:
+                if len(words) == 1:
+                    yield from self._complete_command_names(text_cf, self._entity_cmds_sorted)
+                else:
+                    # Find only entity names
+                    yield from self._complete_entity_arg(words, False, True)
+
+            # Handle 'help' command with CVAR autocompletion
+            elif first_word_cf == "help":
+                if len(words) == 1:
+                    if "help".startswith(text_cf):
+                        yield Completion("help", start_position=-len(text), display="help")
+                else:
+                    arg = words[-1].casefold()
+                    neg_len = -len(arg)
+                    # Snapshot the published trie so iteration stays on one
+                    # generation even if a reload swaps it mid-yield
+                    trie = self.console.cvar_trie
+                    for cmd in itertools.islice(trie.iter_prefix(arg), self._MAX_COMPLETIONS):
+                        yield Completion(cmd, start_position=neg_len, display=cmd)
+            # General CVAR autocompletion
             else:
-                arg = words[-1]
-                with self.console.autocomplete_lock:
-                    if arg != self.last_prefix or arg not in self.console.autocomplete_results:
-                        self.last_prefix = arg
-                        self.console.query_in_progress[arg] = True
-                        threading.Thread(
-                            target=self.console.query_entities,
-                            args=(arg, False, True),  # Find only entity names
-                            daemon=True
-                        ).start()
-                    else:
-                        entity_names = self.console.autocomplete_results.get(arg, [])
-                        for entity_name in entity_names:
-                            yield Completion(
-                                entity_name,
-                                start_position=-len(words[-1]),
-                                display=entity_name
-                            )
-                        return
-
-                start_time = time.time()
-                while time.time() - start_time < 1.0:
-                    with self.console.autocomplete_lock:
-                        if not self.console.query_in_progress.get(arg, False):
-                            entity_names = self.console.autocomplete_results.get(arg, [])
-                            for entity_name in entity_names:
-                                yield Completion(
-                                    entity_name,
-                                    start_position=-len(words[-1]),
-                                    display=entity_name
-                                )
-                            break
-                    time.sleep(0.05)
+                arg = document.get_word_before_cursor()
+                neg_len = -len(arg)
+                trie = self.console.cvar_trie
+                for cmd in itertools.islice(trie.iter_prefix(arg.casefold()), self._MAX_COMPLETIONS):
+                    yield Completion(cmd, start_position=neg_len, display=cmd)
 
-        # Handle 'help' command with CVAR autocompletion
-        elif len(words) >= 1 and words[0].lower() == "help":
-            if len(words) == 1:
-                if "help".startswith(text.lower()):
-                    yield Completion("help", start_position=-len(text), display="help")
-            else:
-                arg = words[-1].lower()
-                for cmd in self.console.cvar_list:
-                    if cmd.lower().startswith(arg):
-                        yield Completion(cmd, start_position=-len(words[-1]), display=cmd)
-        # General CVAR autocompletion
-        else:
-            for completion in self.cvar_completer.get_completions(document, complete_event):
-                yield completion
+    _completer_cls = SourceConsoleCompleter
+    return _completer_cls
 
 def parse_args():
     """Parse command-line arguments."""
@@ -390,6 +570,69 @@ def parse_args():
 
     return args
 
+def _interactive_main(main_console, prompt_text):
+    """Run the interactive prompt loop.
+
+    All prompt_toolkit imports live here so non-interactive invocations
+    never pay for them.
+    """
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.shortcuts import CompleteStyle
+    from prompt_toolkit.key_binding import KeyBindings
+    from prompt_toolkit.completion import ThreadedCompleter
+    from prompt_toolkit.styles import Style
+    from prompt_toolkit.formatted_text import HTML
+
+    print("Source Engine Console Shell")
+    print("Type 'exit' to leave, Ctrl+C to clear prompt, Ctrl+R for reverse search")
+    print(f"Type 'help <cmd>' and press Tab to autocomplete CVARs (e.g., 'help ent_')")
+    print(f"Type 'ent_dump <name>' or 'ent_text <class/entity>' and press Tab to autocomplete names (e.g., 'ent_text prop')")
+    print("-" * 60)
+
+    history_manager = SourceConsoleHistory()
+    base_completer = _get_completer_cls()(main_console)
+    completer = ThreadedCompleter(base_completer)
+
+    bindings = KeyBindings()
+
+    @bindings.add('c-c')
+    def _(event):
+        event.app.current_buffer.reset()
+
+    style = Style.from_dict({
+        'prompt': '#00f bold',
+        '': '#0f0',
+    })
+
+    session = PromptSession(
+        # Parsed once here and reused for every prompt() call
+        HTML(f'<prompt>{prompt_text}> </prompt>'),
+        style=style,
+        history=history_manager.file_history,
+        completer=completer,
+        complete_style=CompleteStyle.READLINE_LIKE,
+        key_bindings=bindings,
+    )
+
+    while True:
+        try:
+            cmd = session.prompt().strip()
+
+            if cmd.lower() == 'exit':
+                break
+            elif cmd == '':
+                continue
+
+            main_console.send_command(cmd, is_autocomplete=False)
+
+            if not main_console.continuous_output:
+                output = main_console.get_output(filter_autocomplete=False)
+                print(output, end='', flush=True)
+
+        except (KeyboardInterrupt, EOFError):
+            print("\nExiting...")
+            break
+
 def main():
     args = parse_args()
     port = args.port
@@ -416,55 +659,7 @@ def main():
             print(output, end='')
             return
 
-        # Interactive mode
-        if verbose:
-            print("Source Engine Console Shell")
-            print("Type 'exit' to leave, Ctrl+C to clear prompt, Ctrl+R for reverse search")
-            print(f"Type 'help <cmd>' and press Tab to autocomplete CVARs (e.g., 'help ent_')")
-            print(f"Type 'ent_dump <name>' or 'ent_text <class/entity>' and press Tab to autocomplete names (e.g., 'ent_text prop')")
-            print("-" * 60)
-
-        base_completer = SourceConsoleCompleter(main_console)
-        completer = ThreadedCompleter(base_completer)
-
-        bindings = KeyBindings()
-
-        @bindings.add('c-c')
-        def _(event):
-            event.app.current_buffer.reset()
-
-        style = Style.from_dict({
-            'prompt': '#00f bold',
-            '': '#0f0',
-        })
-
-        session = PromptSession(
-            HTML(f'<prompt>{prompt_text}> </prompt>'),
-            style=style,
-            history=history_manager.file_history,
-            completer=completer,
-            complete_style=CompleteStyle.READLINE_LIKE,
-            key_bindings=bindings,
-        )
-
-        while True:
-            try:
-                cmd = session.prompt().strip()
-
-                if cmd.lower() == 'exit':
-                    break
-                elif cmd == '':
-                    continue
-
-                main_console.send_command(cmd, is_autocomplete=False)
-
-                if not main_console.continuous_output:
-                    output = main_console.get_output(filter_autocomplete=False)
-                    print(output, end='', flush=True)
-
-            except (KeyboardInterrupt, EOFError):
-                print("\nExiting...")
-                break
+        _interactive_main(main_console, prompt_text)
 
     except EOFError:
         print("\nExiting...", file=sys.stderr)
@@ -479,5 +674,4 @@ def main():
 
 
 if __name__ == "__main__":
-    history_manager = SourceConsoleHistory()
     main()